@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Server Shepherd Agent Protocol
+Wire format shared by the log agents and the backend's TCP server.
+"""
+
+import struct
+
+# JSON frames: little-endian u32 payload length, then a JSON array of records
+FRAME_HEADER = struct.Struct("<I")
+# Largest frame the backend accepts; in raw mode, longer lines are discarded
+MAX_FRAME_SIZE = 1 << 20
+
+# Binary agents open with MAGIC and a mode byte instead of a frame header. As a
+# u32 length MAGIC would be far above MAX_FRAME_SIZE, so the two never collide.
+# The hello is followed by a u8 source count and, per source, <u8 id><u16 len><name>.
+# After that, in MODE_BINARY every record is <u8 source id><f64 timestamp><u16 len><raw line>;
+# in MODE_RAW the agent forwards the log file verbatim as newline-terminated lines
+# from its first source, timestamped on arrival.
+AGENT_MAGIC = b"SHEP"
+MODE_BINARY = 1
+MODE_RAW = 2
+SOURCE_HEADER = struct.Struct("<BH")
+RECORD_HEADER = struct.Struct("<BdH")
+# Longest line a binary record can carry
+MAX_LINE_BYTES = 0xFFFF
+# Id of the single source an agent registers
+SOURCE_ID = 0
+
+def encode_hello(mode: int, source_name: str) -> bytes:
+    """Encode the connection hello that registers an agent's single log source."""
+    source: bytes = source_name.encode('utf-8')
+    return (
+        AGENT_MAGIC + bytes((mode, 1))
+        + SOURCE_HEADER.pack(SOURCE_ID, len(source)) + source
+    )
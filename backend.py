@@ -5,41 +5,68 @@ FastAPI server that receives log data via TCP and broadcasts it via WebSocket.
 """
 
 import asyncio
-import json
-import socket
-import threading
+import itertools
+import re
+import sys
 import time
+from collections import deque
 from contextlib import asynccontextmanager
 from typing import List, Dict, Any
+import orjson
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from websockets.exceptions import ConnectionClosed
 import uvicorn
+from agent_protocol import (
+    AGENT_MAGIC, FRAME_HEADER, MAX_FRAME_SIZE, MODE_BINARY, MODE_RAW, RECORD_HEADER, SOURCE_HEADER
+)
 
 # Global variables for managing connections and data
-active_connections: List[WebSocket] = []
-log_buffer: List[Dict[str, Any]] = []
-tcp_server = None
-tcp_thread = None
-main_event_loop: asyncio.AbstractEventLoop | None = None
+active_connections: set[WebSocket] = set()
+log_buffer: deque[Dict[str, Any]] = deque(maxlen=1000)
+log_index: Dict[str, Dict[str, Any]] = {}
+error_count = 0
+success_count = 0
+# Log ids are hex sequence numbers; seeding with the startup time keeps them
+# from repeating across restarts while the dashboard still holds old entries
+id_counter = itertools.count(int(time.time() * 1000))
+tcp_server: asyncio.Server | None = None
+
+# Initial per-connection receive buffer; grows if a single message is larger
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
+# Parsed logs waiting to be coalesced into one WebSocket frame; flushed
+# after COALESCE_INTERVAL seconds or once COALESCE_MAX_LOGS have queued up
+COALESCE_INTERVAL = 0.02
+COALESCE_MAX_LOGS = 64
+broadcast_queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+coalescer_task: asyncio.Task | None = None
+# Agents stop being read once BROADCAST_HIGH_WATER logs are waiting, and are
+# resumed when the coalescer has brought the queue down to BROADCAST_LOW_WATER
+BROADCAST_HIGH_WATER = 4096
+BROADCAST_LOW_WATER = 1024
+paused_agents: set[asyncio.Transport] = set()
+
+# Clients that cannot take a frame within this many seconds are dropped
+SEND_TIMEOUT = 0.5
+# Errors that just mean the client went away
+SEND_ERRORS = (WebSocketDisconnect, ConnectionClosed, RuntimeError)
+BROADCAST_BATCH_SIZE = 50
+# Close handshakes of dropped clients, referenced until they finish
+closing_tasks: set[asyncio.Task] = set()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global tcp_thread, main_event_loop
-    # Capture the running event loop for thread-safe WS broadcasting
-    try:
-        main_event_loop = asyncio.get_running_loop()
-    except RuntimeError:
-        main_event_loop = None
-    tcp_thread = threading.Thread(target=start_tcp_server)
-    tcp_thread.daemon = True
-    tcp_thread.start()
+    global tcp_server, coalescer_task
+    coalescer_task = asyncio.create_task(coalesce_broadcasts())
+    tcp_server = await asyncio.get_running_loop().create_server(AgentProtocol, "0.0.0.0", 9999)
     print("TCP server started on port 9999")
     yield
     # Shutdown
-    if tcp_server:
-        tcp_server.close()
+    coalescer_task.cancel()
+    tcp_server.close()
 
 app = FastAPI(title="Server Shepherd Backend", version="1.0.0", lifespan=lifespan)
 
@@ -52,12 +79,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables for managing connections and data
-active_connections: List[WebSocket] = []
-log_buffer: List[Dict[str, Any]] = []
-tcp_server = None
-tcp_thread = None
-
 class LogData(BaseModel):
     timestamp: float
     raw_line: str
@@ -68,177 +89,430 @@ class AcknowledgeRequest(BaseModel):
     log_id: str
     timestamp: float
 
-def parse_nginx_log(log_line: str) -> Dict[str, Any]:
+# Combined log format: IP - - [timestamp] "method path protocol" status size "referer" "user_agent"
+_NGINX_RE = re.compile(
+    rb'^(\S+) \S+ \S+ \[[^\]]+\] "(\S+) (\S+)[^"]*" (\d+) (\d+) "[^"]*" "([^"]*)"'
+)
+
+def _unparsed_log(ip: str = "unknown") -> Dict[str, Any]:
+    """Placeholder record for lines that cannot be parsed."""
+    return {"status_code": 500, "ip": ip, "method": "UNKNOWN", "path": "/", "size": 0, "user_agent": "unknown"}
+
+def _scan_nginx_log(line: bytes) -> Dict[str, Any]:
+    """
+    Fallback for lines the regex rejects (truncated, odd request or size fields).
+    Slices between quote offsets instead of splitting the whole line.
+    """
+    q1 = line.find(b'"')
+    q2 = line.find(b'"', q1 + 1) if q1 != -1 else -1
+    ip_end = line.find(b' ')
+    ip = (line[:ip_end] if ip_end != -1 else line).decode('utf-8', 'replace') or "unknown"
+    if q2 == -1:
+        return _unparsed_log(ip)
+
+    request = line[q1 + 1:q2].split(None, 2)
+    method = request[0].decode('utf-8', 'replace') if request else "UNKNOWN"
+    path = request[1].decode('utf-8', 'replace') if len(request) > 1 else "/"
+
+    # Status code and size sit between the request and the referer quote
+    q3 = line.find(b'"', q2 + 1)
+    status_size = line[q2 + 1:q3 if q3 != -1 else len(line)].split()
+    status_code = int(status_size[0]) if status_size and status_size[0].isdigit() else 500
+    size = int(status_size[1]) if len(status_size) > 1 and status_size[1].isdigit() else 0
+
+    # User agent is the third quoted field, after the referer
+    user_agent = "unknown"
+    q4 = line.find(b'"', q3 + 1) if q3 != -1 else -1
+    q5 = line.find(b'"', q4 + 1) if q4 != -1 else -1
+    q6 = line.find(b'"', q5 + 1) if q5 != -1 else -1
+    if q6 != -1:
+        user_agent = line[q5 + 1:q6].decode('utf-8', 'replace')
+
+    return {
+        "status_code": status_code,
+        "ip": ip,
+        "method": method,
+        "path": path,
+        "size": size,
+        "user_agent": user_agent
+    }
+
+def parse_nginx_log(log_line: str | bytes) -> Dict[str, Any]:
     """
     Parse NGINX access log line into structured data.
     Format: IP - - [timestamp] "method path protocol" status size "referer" "user_agent"
     """
+    if isinstance(log_line, str):
+        log_line = log_line.encode('utf-8', 'replace')
+    line = log_line.strip()
+    if not line:
+        return _unparsed_log()
+
     try:
-        # Handle empty or malformed lines
-        if not log_line or not log_line.strip():
-            return {"status_code": 500, "ip": "unknown", "method": "UNKNOWN", "path": "/", "size": 0, "user_agent": "unknown"}
-        
-        parts = log_line.split('"')
-        if len(parts) < 3:
-            # Try to extract basic info even from malformed logs
-            words = log_line.split()
-            if len(words) >= 1:
-                return {
-                    "status_code": 500, 
-                    "ip": words[0] if words else "unknown", 
-                    "method": "UNKNOWN", 
-                    "path": "/", 
-                    "size": 0, 
-                    "user_agent": "unknown"
-                }
-            return {"status_code": 500, "ip": "unknown", "method": "UNKNOWN", "path": "/", "size": 0, "user_agent": "unknown"}
-        
-        # Extract IP and timestamp
-        ip_part = parts[0].strip()
-        ip = ip_part.split()[0] if ip_part else "unknown"
-        
-        # Extract request details
-        request_part = parts[1]
-        request_parts = request_part.split()
-        method = request_parts[0] if len(request_parts) > 0 else "UNKNOWN"
-        path = request_parts[1] if len(request_parts) > 1 else "/"
-        
-        # Extract status code and size
-        status_size_part = parts[2].strip().split()
-        status_code = 500
-        size = 0
-        
-        if status_size_part:
-            try:
-                status_code = int(status_size_part[0])
-            except (ValueError, IndexError):
-                status_code = 500
-                
-        if len(status_size_part) > 1:
-            try:
-                size = int(status_size_part[1])
-            except (ValueError, IndexError):
-                size = 0
-        
+        m = _NGINX_RE.match(line)
         return {
-            "status_code": status_code,
-            "ip": ip,
-            "method": method,
-            "path": path,
-            "size": size,
-            "user_agent": parts[3] if len(parts) > 3 else "unknown"
+            "status_code": int(m.group(4)),
+            "ip": m.group(1).decode('utf-8', 'replace'),
+            "method": m.group(2).decode('utf-8', 'replace'),
+            "path": m.group(3).decode('utf-8', 'replace'),
+            "size": int(m.group(5)),
+            "user_agent": m.group(6).decode('utf-8', 'replace')
         }
-    except Exception as e:
-        print(f"Error parsing log line: {e}")
-        return {"status_code": 500, "ip": "unknown", "method": "UNKNOWN", "path": "/", "size": 0, "user_agent": "unknown"}
+    except AttributeError:
+        # No match; salvage what we can from the quote positions
+        return _scan_nginx_log(line)
 
-async def broadcast_log_data(log_data: Dict[str, Any]):
-    """Broadcast log data to all connected WebSocket clients."""
+async def close_client(connection: WebSocket) -> None:
+    """Close a dropped client so its frontend notices and reconnects."""
+    try:
+        await connection.close(code=1013)  # Try again later
+    except Exception:
+        pass  # Already closed, or the cancelled send left it unusable
+
+def drop_client(connection: WebSocket) -> None:
+    """Stop broadcasting to a client and close its connection in the background."""
+    active_connections.discard(connection)
+    task = asyncio.create_task(close_client(connection))
+    closing_tasks.add(task)
+    task.add_done_callback(closing_tasks.discard)
+
+async def send_to_group(message: bytes, connections: List[WebSocket]) -> None:
+    """Send a message to a group of clients, dropping any that fail or stall."""
+    tasks = {
+        asyncio.create_task(connection.send_bytes(message)): connection
+        for connection in connections
+    }
+    if not tasks:
+        return
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=SEND_TIMEOUT)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    # Drop clients that failed or were too slow to accept the frame
+    for task in pending:
+        task.cancel()
+    for task, connection in tasks.items():
+        if task in pending:
+            drop_client(connection)
+            continue
+        error = task.exception()
+        if error is None:
+            continue
+        if not isinstance(error, SEND_ERRORS):
+            print(f"Error sending to WebSocket client: {error!r}")
+        drop_client(connection)
+
+async def send_to_all(message: bytes) -> None:
+    """Send one pre-encoded message to all connected WebSocket clients."""
+    connections = list(active_connections)
+    if len(connections) <= BROADCAST_BATCH_SIZE:
+        await send_to_group(message, connections)
+        return
+
+    # Large audiences go out in groups, yielding to the event loop in between
+    for i in range(0, len(connections), BROADCAST_BATCH_SIZE):
+        await send_to_group(message, connections[i:i + BROADCAST_BATCH_SIZE])
+        await asyncio.sleep(0)
+
+async def broadcast_batch(logs: List[Dict[str, Any]]) -> None:
+    """Broadcast a batch of log entries as a single frame."""
     if active_connections:
-        message = json.dumps(log_data)
-        disconnected = []
-        
-        for connection in active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            active_connections.remove(connection)
-
-def handle_tcp_connection(client_socket: socket.socket, address: tuple[str, int]) -> None:
-    """Handle incoming TCP connections from log agents."""
-    print(f"TCP connection from {address}")
-    
+        await send_to_all(orjson.dumps({"type": "batch", "logs": logs}))
+
+async def coalesce_broadcasts() -> None:
+    """Merge parsed log batches into as few WebSocket frames as possible."""
+    loop = asyncio.get_running_loop()
+    pending: List[Dict[str, Any]] = []
+    deadline: float | None = None
+
+    while True:
+        timeout = None if deadline is None else max(0.0, deadline - loop.time())
+        try:
+            log_data = await asyncio.wait_for(broadcast_queue.get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        else:
+            if not pending:
+                deadline = loop.time() + COALESCE_INTERVAL
+            pending.append(log_data)
+            # Agents queue a whole read's worth of logs at once; take what is
+            # already there without waiting on the queue for each one
+            while len(pending) < COALESCE_MAX_LOGS and not broadcast_queue.empty():
+                pending.append(broadcast_queue.get_nowait())
+
+        if paused_agents and broadcast_queue.qsize() <= BROADCAST_LOW_WATER:
+            resume_agents()
+
+        if pending and (len(pending) >= COALESCE_MAX_LOGS or loop.time() >= deadline):
+            await broadcast_batch(pending)
+            pending = []
+            deadline = None
+
+def queue_broadcast(log_data: Dict[str, Any]) -> None:
+    """Queue a parsed log for the next WebSocket frame, if anyone is listening."""
+    if active_connections:
+        broadcast_queue.put_nowait(log_data)
+
+def resume_agents() -> None:
+    """Resume reading from agents paused while the broadcast queue was full."""
+    for transport in paused_agents:
+        if not transport.is_closing():
+            transport.resume_reading()
+    paused_agents.clear()
+
+def is_error_log(log_data: Dict[str, Any]) -> bool:
+    """Whether a log entry counts as an error (HTTP status 400 or above)."""
+    return log_data.get("parsed_data", {}).get("status_code", 200) >= 400
+
+def store_log(log_data: Dict[str, Any]) -> None:
+    """Add a log entry to the buffer (last 1000 entries), id index and counters."""
+    global error_count, success_count
+
+    if len(log_buffer) == log_buffer.maxlen:
+        evicted = log_buffer.popleft()
+        log_index.pop(evicted["id"], None)
+        if is_error_log(evicted):
+            error_count -= 1
+        else:
+            success_count -= 1
+
+    log_buffer.append(log_data)
+    log_index[log_data["id"]] = log_data
+    if is_error_log(log_data):
+        error_count += 1
+    else:
+        success_count += 1
+
+def record_log(log_data: Dict[str, Any], parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach parse results and an id to a log entry and buffer it."""
+    log_data["parsed_data"] = parsed_data
+    log_data["id"] = format(next(id_counter), 'x')
+
+    store_log(log_data)
+
+    print(f"Processed log: {parsed_data['status_code']} {parsed_data['method']} {parsed_data['path']}")
+    return log_data
+
+def process_log_record(log_data: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Parse and buffer a single JSON log record received from an agent."""
     try:
-        while True:
-            data: bytes = client_socket.recv(4096)
-            if not data:
-                break
-            
-            # Decode and process each line
-            lines: list[str] = data.decode('utf-8').strip().split('\n')
-            for line in lines:
-                if line.strip():
-                    try:
-                        log_data: Dict[str, Any] = json.loads(line)
-                        
-                        # Parse the raw log line
-                        parsed_data: Dict[str, Any] = parse_nginx_log(log_data["raw_line"])
-                        log_data["parsed_data"] = parsed_data
-                        log_data["id"] = f"{int(time.time() * 1000)}_{hash(line) % 10000}"
-                        
-                        # Add to buffer (keep last 1000 entries)
-                        log_buffer.append(log_data)
-                        if len(log_buffer) > 1000:
-                            log_buffer.pop(0)
-                        
-                        # Broadcast to WebSocket clients using the main event loop captured at startup
-                        try:
-                            if main_event_loop and not main_event_loop.is_closed():
-                                asyncio.run_coroutine_threadsafe(
-                                    broadcast_log_data(log_data), main_event_loop
-                                )
-                            else:
-                                # No loop captured; skip broadcast safely
-                                pass
-                        except Exception as e:
-                            print(f"Error broadcasting log data: {e}")
-                        
-                        print(f"Processed log: {parsed_data['status_code']} {parsed_data['method']} {parsed_data['path']}")
-                        
-                    except json.JSONDecodeError as e:
-                        print(f"Error decoding JSON: {e}")
-                    except Exception as e:
-                        print(f"Error processing log data: {e}")
-    
+        return record_log(log_data, parse_nginx_log(log_data["raw_line"]))
     except Exception as e:
-        print(f"Error in TCP connection: {e}")
-    finally:
-        client_socket.close()
-        print(f"TCP connection closed: {address}")
+        print(f"Error processing log data: {e}")
+    return None
 
-def start_tcp_server():
-    """Start TCP server in a separate thread."""
-    global tcp_server
-    
-    tcp_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    tcp_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    tcp_server.bind(('0.0.0.0', 9999))
-    tcp_server.listen(5)
-    
-    print("TCP server started on port 9999")
-    
-    while True:
+def process_raw_line(source: str, timestamp: float, raw_line: bytes) -> Dict[str, Any] | None:
+    """Parse and buffer a raw log line received from a binary agent."""
+    try:
+        parsed_data = parse_nginx_log(raw_line)
+        log_data: Dict[str, Any] = {
+            "timestamp": timestamp,
+            "raw_line": raw_line.decode('utf-8', 'replace'),
+            "source": source
+        }
+        return record_log(log_data, parsed_data)
+    except Exception as e:
+        print(f"Error processing log data: {e}")
+    return None
+
+class AgentProtocol(asyncio.BufferedProtocol):
+    """
+    Receives log agent traffic into one reused buffer and parses it in place.
+    Agents either send length-prefixed JSON frames or open with AGENT_MAGIC
+    and stream binary records.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray(RECEIVE_BUFFER_SIZE)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # first byte not yet parsed
+        self.end = 0    # end of received data
+        self.reader = self.read_hello
+        self.line_reader = self.read_record
+        self.sources: Dict[int, str] = {}
+        self.sources_left = 0
+        self.transport: asyncio.Transport | None = None
+        self.address = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.address = transport.get_extra_info("peername")
+        print(f"TCP connection from {self.address}")
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        paused_agents.discard(self.transport)
+        self.view.release()
+        print(f"TCP connection closed: {self.address}")
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self.end == len(self.buffer):
+            if self.start > 0:
+                # Move the unparsed tail to the front
+                remaining = self.end - self.start
+                self.buffer[:remaining] = self.view[self.start:self.end]
+                self.start, self.end = 0, remaining
+            else:
+                # A single message is larger than the buffer
+                self.view.release()
+                self.buffer.extend(bytes(len(self.buffer)))
+                self.view = memoryview(self.buffer)
+        return self.view[self.end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.end += nbytes
         try:
-            client_socket, address = tcp_server.accept()
-            # Handle each connection in a separate thread
-            client_thread = threading.Thread(
-                target=handle_tcp_connection,
-                args=(client_socket, address)
-            )
-            client_thread.daemon = True
-            client_thread.start()
+            while self.reader is not None and self.reader():
+                pass
         except Exception as e:
-            print(f"Error accepting TCP connection: {e}")
-            break
+            print(f"Error in TCP connection: {e}")
+            self.transport.close()
+            return
+
+        if self.start == self.end:
+            self.start = self.end = 0
+        # Leave further data in the socket, and so the agent, until the
+        # coalescer catches up
+        if broadcast_queue.qsize() >= BROADCAST_HIGH_WATER and not self.transport.is_closing():
+            self.transport.pause_reading()
+            paused_agents.add(self.transport)
+
+    def available(self) -> int:
+        return self.end - self.start
+
+    def read_hello(self) -> bool:
+        if self.available() < len(AGENT_MAGIC):
+            return False
+        if self.view[self.start:self.start + len(AGENT_MAGIC)] != AGENT_MAGIC:
+            self.reader = self.read_json_frame
+            return True
+        if self.available() < len(AGENT_MAGIC) + 1:
+            return False
+
+        mode = self.buffer[self.start + len(AGENT_MAGIC)]
+        self.start += len(AGENT_MAGIC) + 1
+        if mode == MODE_BINARY:
+            self.line_reader = self.read_record
+            self.reader = self.read_source_count
+        elif mode == MODE_RAW:
+            self.line_reader = self.read_raw_line
+            self.reader = self.read_source_count
+        else:
+            print(f"Unknown agent mode {mode} from {self.address}")
+            self.reader = None
+            self.transport.close()
+        return True
+
+    def read_json_frame(self) -> bool:
+        if self.available() < FRAME_HEADER.size:
+            return False
+        (length,) = FRAME_HEADER.unpack_from(self.buffer, self.start)
+        if length > MAX_FRAME_SIZE:
+            print(f"Frame of {length} bytes exceeds limit, dropping connection")
+            self.reader = None
+            self.transport.close()
+            return False
+        frame_end = self.start + FRAME_HEADER.size + length
+        if self.end < frame_end:
+            return False
+
+        try:
+            records: List[Dict[str, Any]] = orjson.loads(self.view[self.start + FRAME_HEADER.size:frame_end])
+        except orjson.JSONDecodeError as e:
+            print(f"Error decoding JSON: {e}")
+        else:
+            for record in records:
+                log_data = process_log_record(record)
+                if log_data is not None:
+                    queue_broadcast(log_data)
+        self.start = frame_end
+        return True
+
+    def read_source_count(self) -> bool:
+        if self.available() < 1:
+            return False
+        self.sources_left = self.buffer[self.start]
+        self.start += 1
+        self.reader = self.read_source if self.sources_left else self.line_reader
+        return True
+
+    def read_source(self) -> bool:
+        if self.available() < SOURCE_HEADER.size:
+            return False
+        source_id, name_length = SOURCE_HEADER.unpack_from(self.buffer, self.start)
+        name_start = self.start + SOURCE_HEADER.size
+        if self.end < name_start + name_length:
+            return False
+
+        self.sources[source_id] = bytes(self.view[name_start:name_start + name_length]).decode('utf-8', 'replace')
+        self.start = name_start + name_length
+        self.sources_left -= 1
+        if not self.sources_left:
+            self.reader = self.line_reader
+        return True
+
+    def read_record(self) -> bool:
+        if self.available() < RECORD_HEADER.size:
+            return False
+        source_id, timestamp, length = RECORD_HEADER.unpack_from(self.buffer, self.start)
+        line_start = self.start + RECORD_HEADER.size
+        if self.end < line_start + length:
+            return False
+
+        raw_line = bytes(self.view[line_start:line_start + length])
+        self.start = line_start + length
+        log_data = process_raw_line(self.sources.get(source_id, "unknown"), timestamp, raw_line)
+        if log_data is not None:
+            queue_broadcast(log_data)
+        return True
+
+    def read_raw_line(self) -> bool:
+        newline = self.buffer.find(b"\n", self.start, self.end)
+        if newline == -1:
+            if self.available() > MAX_FRAME_SIZE:
+                # Closing would only make the agent resend the same line; skip it
+                print(f"Line of over {MAX_FRAME_SIZE} bytes, discarding it")
+                self.start = self.end
+                self.reader = self.skip_raw_line
+            return False
+
+        raw_line = bytes(self.view[self.start:newline]).strip()
+        self.start = newline + 1
+        if raw_line:
+            source = next(iter(self.sources.values()), "unknown")
+            log_data = process_raw_line(source, time.time(), raw_line)
+            if log_data is not None:
+                queue_broadcast(log_data)
+        return True
+
+    def skip_raw_line(self) -> bool:
+        newline = self.buffer.find(b"\n", self.start, self.end)
+        if newline == -1:
+            self.start = self.end
+            return False
+        # Resume with the line after the discarded one
+        self.start = newline + 1
+        self.reader = self.read_raw_line
+        return True
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time log data."""
     await websocket.accept()
-    active_connections.append(websocket)
+    active_connections.add(websocket)
     print(f"WebSocket client connected. Total connections: {len(active_connections)}")
     
     try:
+        # Liveness is handled by uvicorn's ping/pong; we only wait for the close
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        active_connections.remove(websocket)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        active_connections.discard(websocket)
         print(f"WebSocket client disconnected. Total connections: {len(active_connections)}")
 
 @app.get("/")
@@ -254,34 +528,32 @@ async def root() -> Dict[str, Any]:
 @app.get("/logs")
 async def get_recent_logs(limit: int = 100) -> Dict[str, List[Dict[str, Any]]]:
     """Get recent log entries."""
-    return {"logs": log_buffer[-limit:]}
+    start = max(0, len(log_buffer) - limit)
+    return {"logs": list(itertools.islice(log_buffer, start, None))}
 
 @app.post("/acknowledge")
 async def acknowledge_error(request: AcknowledgeRequest) -> Dict[str, Any]:
     """Acknowledge an error log entry."""
-    # Find the log entry in the buffer and mark it as acknowledged
-    for log in log_buffer:
-        if log.get("id") == request.log_id:
-            log["acknowledged"] = True
-            log["acknowledged_at"] = time.time()
-            return {"status": "acknowledged", "log_id": request.log_id}
+    # Look up the log entry by id and mark it as acknowledged
+    log = log_index.get(request.log_id)
+    if log is not None:
+        log["acknowledged"] = True
+        log["acknowledged_at"] = time.time()
+        return {"status": "acknowledged", "log_id": request.log_id}
     
     return {"status": "not_found", "log_id": request.log_id, "message": "Log entry not found"}
 
 @app.get("/stats")
 async def get_stats() -> Dict[str, Any]:
     """Get basic statistics about the logs."""
-    if not log_buffer:
-        return {"total_logs": 0, "error_count": 0, "success_count": 0, "error_rate": 0.0}
-    
-    error_count = sum(1 for log in log_buffer if log.get("parsed_data", {}).get("status_code", 200) >= 400)
-    success_count = len(log_buffer) - error_count
-    error_rate = error_count / len(log_buffer) if log_buffer else 0.0
+    errors, successes = error_count, success_count
+    total_logs = errors + successes
+    error_rate = errors / total_logs if total_logs else 0.0
     
     return {
-        "total_logs": len(log_buffer),
-        "error_count": error_count,
-        "success_count": success_count,
+        "total_logs": total_logs,
+        "error_count": errors,
+        "success_count": successes,
         "error_rate": error_rate
     }
 
@@ -291,4 +563,14 @@ if __name__ == "__main__":
     print("WebSocket server will be available at ws://localhost:8000/ws")
     print("API documentation at http://localhost:8000/docs")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop is not available on Windows; fall back to the stock asyncio loop there
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        ws="websockets",
+        ws_ping_interval=20,
+        ws_ping_timeout=20
+    )
@@ -6,11 +6,20 @@ Monitors log files using watchdog and sends new log lines via TCP to the backend
 
 import socket
 import time
-import json
 import sys
+import threading
 from pathlib import Path
-from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from agent_protocol import MAX_LINE_BYTES, MODE_BINARY, RECORD_HEADER, SOURCE_ID, encode_hello
+
+# Use inotify directly on Linux so we never fall back to a polling observer
+if sys.platform.startswith('linux'):
+    from watchdog.observers.inotify import InotifyObserver as Observer
+else:
+    from watchdog.observers import Observer
+
+# Modify events arriving within this many seconds are handled by one read
+FLUSH_DELAY = 0.01
 
 class LogFileHandler(FileSystemEventHandler):
     """Handles file modification events for log monitoring."""
@@ -20,7 +29,13 @@ class LogFileHandler(FileSystemEventHandler):
         self.backend_host: str = backend_host
         self.backend_port: int = backend_port
         self.socket: socket.socket | None = None
-        self.last_line_count: int = 0
+        # Byte offset just past the last complete line already sent; start at the
+        # current end of file so only lines written from now on are forwarded
+        self.file_position: int = self.log_file_path.stat().st_size
+        self._pending: bool = False
+        self._flush_timer: threading.Timer | None = None
+        self._flush_lock = threading.Lock()
+        self._send_lock = threading.Lock()
         self.connect_to_backend()
         
     def connect_to_backend(self) -> None:
@@ -28,6 +43,9 @@ class LogFileHandler(FileSystemEventHandler):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((self.backend_host, self.backend_port))
+            # Frames are already batched; don't let Nagle hold them back
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket.sendall(encode_hello(MODE_BINARY, str(self.log_file_path)))
             print(f"Connected to backend at {self.backend_host}:{self.backend_port}")
         except ConnectionRefusedError:
             print(f"Failed to connect to backend at {self.backend_host}:{self.backend_port}")
@@ -44,32 +62,63 @@ class LogFileHandler(FileSystemEventHandler):
             
         # Check if the modified file is our target log file
         if Path(getattr(event, "src_path", "")) == self.log_file_path:
+            self.schedule_flush()
+    
+    def schedule_flush(self) -> None:
+        """Arm a short timer so a burst of modify events triggers a single read."""
+        with self._flush_lock:
+            if self._pending:
+                return
+            self._pending = True
+            self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush_pending)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def flush_pending(self) -> None:
+        """Send whatever was appended since the first event of the burst."""
+        with self._flush_lock:
+            self._pending = False
+            self._flush_timer = None
+        with self._send_lock:
             self.send_new_log_lines()
     
+    def cancel_flush(self) -> None:
+        """Cancel a scheduled flush, if any."""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._pending = False
+    
     def send_new_log_lines(self) -> None:
         """Read new lines from the log file and send them to backend."""
         try:
-            with open(self.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                # Read all lines and get the new ones
-                lines: list[str] = f.readlines()
-                new_lines: list[str] = lines[self.last_line_count:] if hasattr(self, 'last_line_count') else lines
-                self.last_line_count = len(lines)
-                
-                for line in new_lines:
-                    line = line.strip()
-                    if line:  # Only send non-empty lines
-                        # Send the log line as JSON
-                        log_data: dict[str, object] = {
-                            "timestamp": time.time(),
-                            "raw_line": line,
-                            "source": str(self.log_file_path)
-                        }
-                        
-                        message: str = json.dumps(log_data) + '\n'
-                        if self.socket is not None:
-                            self.socket.send(message.encode('utf-8'))
-                        print(f"Sent log line: {line[:50]}...")
-                        
+            # Log was truncated or rotated; start over from the beginning
+            if self.log_file_path.stat().st_size < self.file_position:
+                self.file_position = 0
+            
+            # Read only the bytes appended since the last event
+            with open(self.log_file_path, 'rb') as f:
+                f.seek(self.file_position)
+                chunk: bytes = f.read()
+            
+            # Leave a trailing partial line for the next event
+            end: int = chunk.rfind(b'\n') + 1
+            self.file_position += end
+            
+            # Raw lines go out as-is behind a small binary header
+            records: list[bytes] = []
+            for line in chunk[:end].splitlines():
+                line = line.strip()[:MAX_LINE_BYTES]
+                if line:  # Only send non-empty lines
+                    records.append(RECORD_HEADER.pack(SOURCE_ID, time.time(), len(line)))
+                    records.append(line)
+                    print(f"Sent log line: {line[:50].decode('utf-8', errors='ignore')}...")
+            
+            # Everything from this file event goes out in a single write
+            if records and self.socket is not None:
+                self.socket.sendall(b"".join(records))
+                    
         except Exception as e:
             print(f"Error reading/sending log file: {e}")
             # Try to reconnect if connection was lost
@@ -115,11 +164,13 @@ def main():
     except KeyboardInterrupt:
         print("\nStopping log agent...")
         observer.stop()
+        event_handler.cancel_flush()
         if event_handler.socket is not None:
             event_handler.socket.close()
     except Exception as e:
         print(f"Error in log agent: {e}")
         observer.stop()
+        event_handler.cancel_flush()
         if event_handler.socket is not None:
             event_handler.socket.close()
     finally:
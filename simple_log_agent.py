@@ -1,32 +1,146 @@
 #!/usr/bin/env python3
 """
 Simple Log Agent for Server Shepherd
-Monitors log files using polling instead of watchdog to avoid threading issues.
+Monitors log files without watchdog to avoid threading issues: it blocks on
+inotify on Linux and falls back to polling elsewhere.
 """
 
+import logging
+import os
+import queue
+import random
+import select
+import signal
 import socket
+import threading
 import time
-import json
 import sys
 from pathlib import Path
+import orjson
+from agent_protocol import (
+    FRAME_HEADER, MAX_FRAME_SIZE, MAX_LINE_BYTES, MODE_BINARY, MODE_RAW, RECORD_HEADER, SOURCE_ID,
+    encode_hello
+)
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not on Linux, or inotify_simple isn't installed
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+# Larger batches are split across several frames
+MAX_BATCH_BYTES = 256 * 1024
+# Encoded lines at least this long are not copied into the frame buffer; the
+# frame is sent as a list of segments with sendmsg instead
+SCATTER_MIN_LINE_BYTES = 8 * 1024
+# Sent frame buffers kept for reuse; any beyond this are freed
+MAX_FREE_BUFFERS = 4
+# Bytes requested from the log file per read
+READ_SIZE = 64 * 1024
+# A freshly opened file with more than this much to send is read in slices of
+# CATCHUP_SLICE_BYTES rather than READ_SIZE at a time
+CATCHUP_BYTES = 1 << 20
+CATCHUP_SLICE_BYTES = 8 << 20
+# Linux-only "more data follows" send flag; a no-op elsewhere
+MSG_MORE = getattr(socket, 'MSG_MORE', 0)
+
+# A queued frame (one view, or segments when long lines were spliced in),
+# or an (fd, offset, count) file range of whole lines in raw mode
+SendItem = memoryview | list[memoryview | bytes] | tuple[int, int, int]
+# Polling interval: reset to the minimum whenever data arrives and doubled up
+# to the maximum while the file is idle
+MIN_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+# Cap for the retry delay while the log file is missing
+MAX_REOPEN_DELAY = 8.0
+# Frames waiting for the sender thread. Once it is full, file reading waits for
+# the sender, checking for a stop or a lost connection every ENQUEUE_POLL_INTERVAL
+# seconds. Each queued frame holds a frame buffer, so this also bounds their memory
+SEND_QUEUE_SIZE = 64
+ENQUEUE_POLL_INTERVAL = 0.1
+# Reconnect backoff: doubles from the minimum up to the cap, with jitter
+RECONNECT_MIN_DELAY = 0.1
+RECONNECT_MAX_DELAY = 5.0
+# On shutdown, how long the sender may take to flush queued batches
+DRAIN_TIMEOUT = 2.0
 
 class SimpleLogAgent:
-    """Simple log agent that polls file for changes."""
+    """Simple log agent that blocks on inotify for file changes, polling where it is unavailable."""
     
-    def __init__(self, log_file_path: str, backend_host: str = 'localhost', backend_port: int = 9999):
+    def __init__(self, log_file_path: str, backend_host: str = 'localhost', backend_port: int = 9999,
+                 raw: bool = False, binary: bool = False):
         self.log_file_path: Path = Path(log_file_path)
+        # String and bytes forms for the calls made on every read, rotation check and reconnect
+        self._path_str: str = str(self.log_file_path)
+        self._path_bytes: bytes = os.fsencode(self._path_str)
         self.backend_host: str = backend_host
         self.backend_port: int = backend_port
+        # Raw mode forwards file bytes verbatim with sendfile instead of JSON frames;
+        # binary mode sends length-prefixed records, which skip JSON on both ends
+        self.raw: bool = raw
+        self.binary: bool = binary
         self.socket: socket.socket | None = None
+        # Frames (or, in raw mode, file ranges) are queued for a sender thread that
+        # owns the socket; connected is clear while it is reconnecting
+        self.send_queue: queue.Queue = queue.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.connected = threading.Event()
+        self.dropped: int = 0
+        # Set by the SIGINT/SIGTERM handler; the signal also writes to _wake_w,
+        # which interrupts the monitor loop's wait
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_w.setblocking(False)
         self.last_position: int = 0
-        self.connect_to_backend()
-        
-    def connect_to_backend(self):
-        """Establish connection to the backend server."""
+        # The record shape is fixed, so records are assembled from constant pieces
+        # around the two varying fields; the source's JSON is encoded only once
+        self._source_json: bytes = orjson.dumps(self._path_str)
+        self._record_prefix: bytes = b'{"timestamp":'
+        self._record_mid: bytes = b',"raw_line":'
+        self._record_suffix: bytes = b',"source":' + self._source_json + b'}'
+        # Record size excluding the raw line, allowing for a comma and the timestamp
+        self._record_overhead: int = (
+            len(self._record_prefix) + len(self._record_mid) + len(self._record_suffix) + 24
+        )
+        # Frame buffers go to the sender and come back through _free_buffers once
+        # sent; _off is the write position in the current one. Long lines spliced
+        # into the frame are collected in _segments, which _spliced counts.
+        # A buffer holds a batch plus the record that ends it: in JSON mode one
+        # whose line is just short of being spliced, in binary mode a maximal line
+        self._buffer_size: int = MAX_BATCH_BYTES + max(
+            SCATTER_MIN_LINE_BYTES + self._record_overhead,
+            RECORD_HEADER.size + MAX_LINE_BYTES
+        )
+        self._free_buffers: queue.SimpleQueue = queue.SimpleQueue()
+        self._buf: bytearray = self.take_buffer()
+        self._off: int = 0
+        self._seg_start: int = 0
+        self._segments: list[memoryview | bytes] = []
+        self._spliced: int = 0
+        # The log file is opened lazily by the monitor loop and then stays open
+        # between reads; unterminated trailing bytes wait in _tail
+        self._fd: int | None = None
+        self._tail = bytearray()
+        self.inode: int | None = None
+        # Size of the file when opened, i.e. the backlog still to be sent
+        self._backlog: int = 0
+        # Raw mode: file offset up to which we know no newline follows last_position
+        self._scanned: int = 0
+        # Bytes of the current raw range the sender has written so far
+        self._range_sent: int = 0
+        self.inotify = None
+        self._file_wd: int | None = None
+        if INotify is not None and sys.platform.startswith('linux'):
+            # Watch the directory for files appearing at or leaving our path;
+            # writes are watched on the open file itself (see open_log_file)
+            self.inotify = INotify()
+            self.inotify.add_watch(
+                str(self.log_file_path.parent),
+                flags.CREATE | flags.MOVED_TO | flags.DELETE
+            )
+        # Fail fast if the backend is not up at start; later failures are retried
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.backend_host, self.backend_port))
-            print(f"Connected to backend at {self.backend_host}:{self.backend_port}")
+            self.connect_to_backend()
         except ConnectionRefusedError:
             print(f"Failed to connect to backend at {self.backend_host}:{self.backend_port}")
             print("Make sure the backend server is running first!")
@@ -34,78 +148,525 @@ class SimpleLogAgent:
         except Exception as e:
             print(f"Error connecting to backend: {e}")
             sys.exit(1)
-    
-    def send_log_line(self, line: str) -> None:
-        """Send a log line to the backend."""
+        self.sender = threading.Thread(target=self.send_loop, name="sender", daemon=True)
+        self.sender.start()
+        
+    def connect_to_backend(self) -> None:
+        """Establish connection to the backend server; raises OSError on failure."""
+        sock = socket.create_connection((self.backend_host, self.backend_port))
         try:
-            log_data: dict[str, object] = {
-                "timestamp": time.time(),
-                "raw_line": line,
-                "source": str(self.log_file_path)
-            }
-            
-            message: str = json.dumps(log_data) + '\n'
-            if self.socket is not None:
-                self.socket.send(message.encode('utf-8'))
-                print(f"Sent log line: {line[:50]}...")
-            else:
-                print("Socket is not connected. Cannot send log line.")
-            
-        except Exception as e:
-            print(f"Error sending log line: {e}")
-            # Try to reconnect
+            # Lines are already batched; don't let Nagle hold them back
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.raw or self.binary:
+                sock.sendall(encode_hello(MODE_RAW if self.raw else MODE_BINARY, self._path_str))
+        except OSError:
+            sock.close()
+            raise
+        self.socket = sock
+        self.connected.set()
+        print(f"Connected to backend at {self.backend_host}:{self.backend_port}")
+    
+    def reconnect(self) -> None:
+        """Replace the socket, retrying with exponential backoff until it connects."""
+        delay: float = RECONNECT_MIN_DELAY
+        self.connected.clear()
+        while True:
             try:
                 if self.socket is not None:
                     self.socket.close()
-            except Exception:
+            except OSError:
                 pass
-            self.connect_to_backend()
+            self.socket = None
+            try:
+                self.connect_to_backend()
+                return
+            except OSError as e:
+                # Jitter keeps a fleet of agents from reconnecting in lockstep
+                wait: float = delay * random.uniform(0.5, 1.5)
+                print(f"Reconnect to backend failed ({e}), retrying in {wait:.1f}s")
+                time.sleep(wait)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+    
+    def enqueue(self, item: SendItem, more: bool = False) -> None:
+        """Hand a frame or file range to the sender thread, waiting while it is behind."""
+        while True:
+            try:
+                self.send_queue.put((item, more), timeout=ENQUEUE_POLL_INTERVAL)
+                return
+            except queue.Full:
+                # The file still holds the data, so a slow backend just pauses
+                # reading; only while it is unreachable, or when stopping, is the
+                # batch given up so the monitor loop does not stall
+                if self.connected.is_set() and not self._stop.is_set():
+                    continue
+            self.recycle(item)
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"Send queue full, dropped {self.dropped} batches so far")
+            return
+    
+    def recycle(self, item: SendItem) -> None:
+        """Release a queued item: return a frame's buffer to the pool, or close a range's fd."""
+        if isinstance(item, tuple):
+            os.close(item[0])
+            return
+        views: list[memoryview | bytes] = item if isinstance(item, list) else [item]
+        # The first segment always views the frame buffer
+        buffer: bytearray = views[0].obj
+        for view in views:
+            if isinstance(view, memoryview):
+                view.release()
+        # Keep a few for the next frames; the rest of a burst's buffers are freed
+        if self._free_buffers.qsize() < MAX_FREE_BUFFERS:
+            self._free_buffers.put(buffer)
+    
+    def backend_closed(self) -> bool:
+        """Whether the backend has closed its end; it never sends data, so a readable socket means it has."""
+        if not select.select([self.socket], [], [], 0)[0]:
+            return False
+        return not self.socket.recv(1)
+    
+    def send_item(self, item: SendItem, more: bool) -> None:
+        """Write one queued frame, or copy one queued file range, to the socket."""
+        self._range_sent = 0
+        # A write to a socket the backend has closed would still succeed, and
+        # the item would be lost; only the write after it fails
+        if self.backend_closed():
+            raise ConnectionResetError("Backend closed the connection")
+        if isinstance(item, tuple):
+            fd, offset, count = item
+            while self._range_sent < count:
+                sent: int = os.sendfile(
+                    self.socket.fileno(), fd, offset + self._range_sent, count - self._range_sent
+                )
+                if not sent:
+                    break  # The file was truncated under us
+                self._range_sent += sent
+        elif isinstance(item, list):
+            self.send_segments(item, MSG_MORE if more else 0)
+        else:
+            self.socket.sendall(item, MSG_MORE if more else 0)
+    
+    def send_segments(self, segments: list[memoryview | bytes], send_flags: int) -> None:
+        """Send a segmented frame with scatter-gather writes, resuming after short ones."""
+        if not hasattr(self.socket, 'sendmsg'):  # Windows
+            self.socket.sendall(b"".join(segments), send_flags)
+            return
+        # Work on a copy: the item must stay whole in case it has to be resent
+        pending: list[memoryview | bytes] = list(segments)
+        while pending:
+            sent: int = self.socket.sendmsg(pending, (), send_flags)
+            while sent:
+                size: int = len(pending[0])
+                if sent < size:
+                    pending[0] = memoryview(pending[0])[sent:]
+                    break
+                sent -= size
+                del pending[0]
+    
+    def line_end(self, fd: int, start: int, end: int) -> int | None:
+        """Offset just past the last newline in [start, end) of fd, or None if there is none."""
+        while end > start:
+            size: int = min(READ_SIZE, end - start)
+            newline: int = os.pread(fd, size, end - size).rfind(b'\n')
+            if newline != -1:
+                return end - size + newline + 1
+            end -= size
+        return None
+    
+    def unsent_lines(self, item: tuple[int, int, int]) -> tuple[int, int, int]:
+        """
+        The part of a raw file range to resend on a new connection. The backend
+        handled every complete line that reached it and drops a trailing partial
+        one, so sending resumes after the last newline written. Lines still in
+        the kernel's send buffer when the connection died are lost, not repeated.
+        """
+        fd, offset, count = item
+        resume: int = self.line_end(fd, offset, offset + self._range_sent) or offset
+        return fd, resume, offset + count - resume
+    
+    def send_loop(self) -> None:
+        """Sender thread: write queued items in order, reconnecting as needed."""
+        while True:
+            item, more = self.send_queue.get()
+            if item is None:
+                break  # Shutting down and everything before this was sent
+            try:
+                # A frame cut off by a dropped connection is resent whole on the
+                # new one, as the backend discards the partial frame; a raw range
+                # resumes after its last line that was sent in full
+                while True:
+                    try:
+                        self.send_item(item, more)
+                        break
+                    except OSError as e:
+                        print(f"Error sending log data: {e}")
+                        if isinstance(item, tuple):
+                            item = self.unsent_lines(item)
+                        self.reconnect()
+            finally:
+                self.recycle(item)
+        try:
+            # Tell the backend we are done once the kernel has sent everything
+            self.socket.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+    
+    def stop_sender(self) -> None:
+        """Let the sender flush what is queued, giving up after DRAIN_TIMEOUT."""
+        try:
+            self.send_queue.put((None, False), timeout=DRAIN_TIMEOUT)
+        except queue.Full:
+            pass
+        self.sender.join(DRAIN_TIMEOUT)
+        if self.sender.is_alive():
+            print(f"Backend unreachable, {self.send_queue.qsize()} batches were not sent")
+    
+    def take_buffer(self) -> bytearray:
+        """Reuse a frame buffer the sender is done with, or allocate a new one."""
+        try:
+            return self._free_buffers.get_nowait()
+        except queue.Empty:
+            return bytearray(self._buffer_size)
+    
+    def write(self, data: bytes) -> None:
+        """Copy bytes into the frame buffer at the write position."""
+        end: int = self._off + len(data)
+        self._buf[self._off:end] = data
+        self._off = end
+    
+    def start_frame(self) -> None:
+        """Reset the send buffer to an empty frame: header placeholder and '['."""
+        self._off = FRAME_HEADER.size
+        self._seg_start = 0
+        self._segments = []
+        self._spliced = 0
+        self.write(b"[")
+    
+    def send_frame(self, more: bool = False) -> None:
+        """
+        Close the JSON array in the send buffer and send it as one frame.
+        With more=True the kernel is told another frame follows right away,
+        so it can fill whole segments instead of flushing a partial one.
+        """
+        self.write(b"]")
+        FRAME_HEADER.pack_into(self._buf, 0, self._off + self._spliced - FRAME_HEADER.size)
+        # The sender gets a view of the filled part; no copy is made
+        tail = memoryview(self._buf)[self._seg_start:self._off]
+        if self._segments:
+            self._segments.append(tail)
+            self.enqueue(self._segments, more)
+        else:
+            self.enqueue(tail, more)
+        self._buf = self.take_buffer()
+        self.start_frame()
+    
+    def send_records(self, lines: list[bytes], more: bool = False) -> None:
+        """Send a batch of log lines as binary records; more=True if another batch follows."""
+        debug: bool = logger.isEnabledFor(logging.DEBUG)
+        timestamp: float = time.time()
+        self._off = 0
+        for line in lines:
+            line = line[:MAX_LINE_BYTES]
+            if self._off and self._off + RECORD_HEADER.size + len(line) >= MAX_BATCH_BYTES:
+                self.enqueue(memoryview(self._buf)[:self._off], more=True)
+                self._buf = self.take_buffer()
+                self._off = 0
+            RECORD_HEADER.pack_into(self._buf, self._off, SOURCE_ID, timestamp, len(line))
+            self._off += RECORD_HEADER.size
+            self.write(line)
+            if debug:
+                logger.debug(f"Sent log line: {line[:50].decode('utf-8', 'replace')}...")
+        
+        if self._off:
+            self.enqueue(memoryview(self._buf)[:self._off], more)
+            self._buf = self.take_buffer()
+    
+    def send_log_lines(self, lines: list[bytes], more: bool = False) -> None:
+        """Send a batch of log lines to the backend; more=True if another batch follows."""
+        if self.binary:
+            self.send_records(lines, more)
+            return
+        empty_frame: int = FRAME_HEADER.size + 1
+        debug: bool = logger.isEnabledFor(logging.DEBUG)
+        # Lines read together share one timestamp, sampled and formatted once
+        timestamp: bytes = b"%.3f" % time.time()
+        self.start_frame()
+        for line in lines:
+            # Decode only here, as the JSON string needs text; invalid bytes
+            # become U+FFFD, matching how the backend decodes raw lines
+            text: str = line.decode('utf-8', 'replace')
+            raw_line: bytes = orjson.dumps(text)
+            record_size: int = len(raw_line) + self._record_overhead
+            if empty_frame + record_size + 1 > MAX_FRAME_SIZE:
+                logger.warning(f"Skipping a {len(line)} byte line, too long for one frame")
+                continue
+            
+            # Flush early rather than let one frame grow without bound
+            frame_size: int = self._off + self._spliced
+            if frame_size > empty_frame and frame_size + record_size >= MAX_BATCH_BYTES:
+                self.send_frame(more=True)
+            if self._off + self._spliced > empty_frame:
+                self.write(b",")
+            self.write(self._record_prefix)
+            self.write(timestamp)
+            self.write(self._record_mid)
+            if len(raw_line) >= SCATTER_MIN_LINE_BYTES:
+                # Reference the long line as its own segment instead of copying it
+                self._segments.append(memoryview(self._buf)[self._seg_start:self._off])
+                self._segments.append(raw_line)
+                self._seg_start = self._off
+                self._spliced += len(raw_line)
+            else:
+                self.write(raw_line)
+            self.write(self._record_suffix)
+            if debug:
+                logger.debug(f"Sent log line: {text[:50]}...")
+        
+        if self._off > empty_frame:
+            self.send_frame(more=more)
+    
+    def current_inode(self) -> int | None:
+        """Inode of the file currently at the log path, or None if it is missing."""
+        try:
+            return os.stat(self._path_bytes).st_ino
+        except FileNotFoundError:
+            return None
+    
+    def open_log_file(self) -> bool:
+        """Open the log file from the start; returns False if it does not exist yet."""
+        try:
+            self._fd = os.open(self._path_bytes, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(self._fd)
+        self.inode = stat.st_ino
+        self._backlog = stat.st_size
+        self._scanned = 0
+        self.last_position = 0
+        self._tail.clear()
+        if self.inotify is not None:
+            # This watch follows the inode, so writes to it are still seen after
+            # it is renamed away by a rotation
+            self._file_wd = self.inotify.add_watch(
+                self._path_bytes,
+                flags.MODIFY | flags.MOVE_SELF | flags.DELETE_SELF
+            )
+        return True
+    
+    def close_log_file(self) -> None:
+        """Send what is left of the open log file, then close it."""
+        self.forward_new_data()
+        os.close(self._fd)
+        self._fd = None
+        if self._file_wd is not None:
+            try:
+                self.inotify.rm_watch(self._file_wd)
+            except OSError:
+                pass  # The kernel already dropped it (IN_IGNORED)
+            self._file_wd = None
+    
+    def check_rotation(self) -> None:
+        """Switch to a new file at the log path once the old one has been drained."""
+        inode = self.current_inode()
+        if inode == self.inode:
+            return
+        if inode is None:
+            # Keep reading a file that was only renamed away, as its writer may not
+            # have reopened yet; give up on it once it is actually deleted
+            if os.fstat(self._fd).st_nlink:
+                return
+            self.close_log_file()
+            print(f"Log file {self.log_file_path} was removed, waiting for a new one")
+            return
+        self.close_log_file()
+        if self.open_log_file():
+            print(f"Log file {self.log_file_path} was rotated, reading new file")
+    
+    def forward_new_data(self) -> bool:
+        """Send whatever has been appended to the log since the last call; False if nothing was."""
+        if self.raw:
+            return self.send_raw_bytes()
+        return self.read_new_lines()
+    
+    def send_raw_bytes(self) -> bool:
+        """Queue the newly appended whole lines to be copied to the socket in the kernel."""
+        size: int = os.fstat(self._fd).st_size
+        # Ranges end on a newline, so a resend on a new connection starts on a line
+        # boundary; an unterminated last line waits until it is complete
+        end: int | None = self.line_end(self._fd, max(self.last_position, self._scanned), size)
+        self._scanned = size
+        if end is None:
+            return False
+        # The sender gets its own fd, so the range stays readable after a rotation closes ours
+        self.enqueue((os.dup(self._fd), self.last_position, end - self.last_position))
+        self.last_position = end
+        return True
+    
+    def send_chunk(self, chunk: bytes, more: bool) -> None:
+        """Send the complete lines in a chunk read from the file."""
+        # Keep the unterminated remainder for the next chunk
+        self._tail += chunk
+        *new_lines, rest = self._tail.split(b'\n')
+        self._tail = rest
+        
+        # Send new non-empty lines as one batch; they stay bytes until encoding
+        lines = [line for line in (raw.strip() for raw in new_lines) if line]
+        if lines:
+            self.send_log_lines(lines, more=more)
+    
+    def catch_up(self) -> None:
+        """Send the backlog of a freshly opened file in large reads."""
+        size: int = self._backlog
+        self._backlog = 0
+        # Plain reads rather than mmap: a file truncated while mapped (as with
+        # logrotate's copytruncate) would kill the process with SIGBUS
+        while self.last_position < size and not self._stop.is_set():
+            want: int = min(CATCHUP_SLICE_BYTES, size - self.last_position)
+            chunk = os.read(self._fd, want)
+            if not chunk:
+                break  # The file was truncated under us
+            self.last_position += len(chunk)
+            # Only the final slice's last frame may be flushed right away
+            self.send_chunk(chunk, more=len(chunk) == want and self.last_position < size)
+    
+    def read_new_lines(self) -> bool:
+        """Send any complete lines appended since the last read."""
+        start: int = self.last_position
+        if self._backlog > CATCHUP_BYTES:
+            self.catch_up()
+        while True:
+            chunk = os.read(self._fd, READ_SIZE)
+            self.last_position += len(chunk)
+            # A short read means we reached EOF; skip the extra empty read
+            at_eof: bool = len(chunk) < READ_SIZE
+            self.send_chunk(chunk, more=not at_eof)
+            if at_eof or self._stop.is_set():
+                return self.last_position != start
+    
+    def wait_for_inotify(self) -> None:
+        """Block until the log file is written, then send the new lines."""
+        # Pick up anything written before we started watching
+        if self._fd is not None or self.open_log_file():
+            self.forward_new_data()
+        
+        name: str = self.log_file_path.name
+        while self.wait(self.inotify):
+            # The inotify fd is readable unless we were woken by a signal
+            events = [e for e in self.inotify.read(timeout=0) if e.name == name or e.wd == self._file_wd]
+            if not events:
+                continue
+            
+            # Only a file moving, appearing or vanishing at our path can mean
+            # rotation; the inode check then decides without any polling
+            if self._fd is not None and any(
+                e.mask & (flags.CREATE | flags.MOVED_TO | flags.DELETE)
+                if e.name else e.mask & (flags.MOVE_SELF | flags.DELETE_SELF)
+                for e in events
+            ):
+                self.check_rotation()
+            
+            # A new file at our path (e.g. after logrotate) is read from the start
+            if self._fd is None:
+                self.open_log_file()
+            
+            if self._fd is not None:
+                self.forward_new_data()
+    
+    def poll(self) -> None:
+        """Check the log file for new lines, polling faster while it is busy."""
+        interval: float = MIN_POLL_INTERVAL
+        delay: float = MAX_POLL_INTERVAL
+        while True:
+            if self._fd is None:
+                if not self.open_log_file():
+                    print(f"Log file {self.log_file_path} not found, waiting...")
+                    # Back off while the file stays missing
+                    if not self.wait(timeout=delay):
+                        return
+                    delay = min(delay * 2, MAX_REOPEN_DELAY)
+                    continue
+                delay = MAX_POLL_INTERVAL
+            
+            if self.forward_new_data():
+                interval = MIN_POLL_INTERVAL
+            else:
+                interval = min(interval * 2, MAX_POLL_INTERVAL)
+                # The path is only stat'ed for rotation when the open file has gone quiet
+                self.check_rotation()
+            
+            if not self.wait(timeout=interval):
+                return
+    
+    def wait(self, *fds, timeout: float | None = None) -> bool:
+        """Wait until a fd is readable or the timeout passes; False once a stop is requested."""
+        ready, _, _ = select.select([self._wake_r, *fds], [], [], timeout)
+        if self._wake_r in ready:
+            self._wake_r.recv(64)
+        return not self._stop.is_set()
+    
+    def request_stop(self, signum: int, frame) -> None:
+        """SIGINT/SIGTERM handler: stop after the batch in progress."""
+        self._stop.set()
     
     def monitor_file(self):
         """Monitor the log file for new lines."""
         print(f"Monitoring file: {self.log_file_path}")
         print("Press Ctrl+C to stop.")
         
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.set_wakeup_fd(self._wake_w.fileno())
         try:
-            while True:
-                if self.log_file_path.exists():
-                    with open(self.log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        # Move to last known position
-                        f.seek(self.last_position)
-                        
-                        # Read new lines
-                        new_lines = f.readlines()
-                        self.last_position = f.tell()
-                        
-                        # Send new lines
-                        for line in new_lines:
-                            line = line.strip()
-                            if line:  # Only send non-empty lines
-                                self.send_log_line(line)
-                else:
-                    print(f"Log file {self.log_file_path} not found, waiting...")
-                
-                time.sleep(0.5)  # Poll every 500ms
-                
-        except KeyboardInterrupt:
+            if self.inotify is not None:
+                self.wait_for_inotify()
+            else:
+                self.poll()
             print("\nStopping log agent...")
+                
         except Exception as e:
             print(f"Error monitoring file: {e}")
         finally:
+            if self.inotify is not None:
+                self.inotify.close()
+            if self._fd is not None:
+                os.close(self._fd)
+            # Queued batches are flushed before the connection is closed
+            self.stop_sender()
             if self.socket:
                 self.socket.close()
+            signal.set_wakeup_fd(-1)
+            self._wake_r.close()
+            self._wake_w.close()
             print("Log agent stopped.")
 
 def main():
     """Main function to start the log agent."""
-    if len(sys.argv) < 2:
-        print("Usage: python simple_log_agent.py <log_file_path> [backend_host] [backend_port]")
+    options = {arg for arg in sys.argv[1:] if arg.startswith('--')}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python simple_log_agent.py <log_file_path> [backend_host] [backend_port] [--verbose] [--raw | --binary-frame]")
         print("Example: python simple_log_agent.py logs/sample.log localhost 9999")
         sys.exit(1)
     
-    log_file_path = sys.argv[1]
-    backend_host = sys.argv[2] if len(sys.argv) > 2 else 'localhost'
-    backend_port = int(sys.argv[3]) if len(sys.argv) > 3 else 9999
+    log_file_path = args[0]
+    backend_host = args[1] if len(args) > 1 else 'localhost'
+    backend_port = int(args[2]) if len(args) > 2 else 9999
+    
+    # Per-line output is debug-level and only shown with --verbose
+    logging.basicConfig(
+        level=logging.DEBUG if '--verbose' in options else logging.WARNING,
+        format="%(message)s"
+    )
+    
+    raw = '--raw' in options
+    if raw and not hasattr(os, 'sendfile'):
+        print("Error: --raw needs os.sendfile, which this platform does not provide")
+        sys.exit(1)
+    binary = '--binary-frame' in options
+    if raw and binary:
+        print("Error: --raw and --binary-frame cannot be combined")
+        sys.exit(1)
     
     # Check if log file exists
     if not Path(log_file_path).exists():
@@ -116,7 +677,7 @@ def main():
     print(f"Backend: {backend_host}:{backend_port}")
     
     # Create and start agent
-    agent = SimpleLogAgent(log_file_path, backend_host, backend_port)
+    agent = SimpleLogAgent(log_file_path, backend_host, backend_port, raw=raw, binary=binary)
     agent.monitor_file()
 
 if __name__ == "__main__":
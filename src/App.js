@@ -2,6 +2,8 @@ import React, { useState, useEffect, useRef } from 'react';
 import Sketch from 'react-p5';
 import './index.css';
 
+const textDecoder = new TextDecoder();
+
 function App() {
   const backendBaseUrl = (process.env.REACT_APP_BACKEND_URL || 'http://localhost:8000').replace(/\/$/, '');
   const wsUrl = backendBaseUrl.replace(/^http/, 'ws') + '/ws';
@@ -22,6 +24,8 @@ function App() {
   useEffect(() => {
     const connectWebSocket = () => {
       const ws = new WebSocket(wsUrl);
+      // Log batches arrive as binary frames of UTF-8 JSON
+      ws.binaryType = 'arraybuffer';
       
       ws.onopen = () => {
         console.log('WebSocket connected');
@@ -29,19 +33,23 @@ function App() {
       };
       
       ws.onmessage = (event) => {
-        console.log('WebSocket message received:', event.data);
+        const text = typeof event.data === 'string'
+          ? event.data
+          : textDecoder.decode(event.data);
+        console.log('WebSocket message received:', text);
         try {
-          const logData = JSON.parse(event.data);
-          console.log('Parsed log data:', logData);
+          const data = JSON.parse(text);
+          // The backend coalesces log entries into {type: 'batch', logs: [...]} frames
+          const entries = data.type === 'batch' ? data.logs : [data];
+          console.log('Parsed log data:', entries);
           setLogs(prevLogs => {
-            const newLogs = [...prevLogs, logData];
+            const newLogs = [...prevLogs, ...entries];
             // Keep only last 100 logs for performance
             return newLogs.slice(-100);
           });
           
-          // Create a sheep for this log entry
-          console.log('Creating sheep for log:', logData);
-          createSheep(logData);
+          // Create a sheep for each log entry
+          entries.forEach(logData => createSheep(logData));
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
         }
@@ -0,0 +1,142 @@
+"""
+Framing tests for the backend's agent protocol parser.
+Streams are fed through get_buffer/buffer_updated in random chunk sizes, so
+messages straddle reads and the receive buffer is compacted and grown.
+"""
+
+import random
+
+import orjson
+import pytest
+
+import backend
+from agent_protocol import (
+    FRAME_HEADER, MAX_FRAME_SIZE, MODE_BINARY, MODE_RAW, RECORD_HEADER, SOURCE_ID, encode_hello
+)
+
+SOURCE = "/var/log/nginx/access.log"
+
+
+def log_line(path: str, padding: int = 0) -> bytes:
+    return (
+        f'10.0.0.1 - - [10/Oct/2025:13:55:36 +0000] "GET {path}{"x" * padding} HTTP/1.1" '
+        f'200 512 "-" "curl/8.0"'
+    ).encode()
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def get_extra_info(self, name: str):
+        return ("127.0.0.1", 50000)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def is_closing(self) -> bool:
+        return self.closed
+
+    def pause_reading(self) -> None:
+        pass
+
+    def resume_reading(self) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    backend.log_buffer.clear()
+    backend.log_index.clear()
+    backend.error_count = backend.success_count = 0
+    yield
+    backend.log_buffer.clear()
+    backend.log_index.clear()
+
+
+def feed(data: bytes, max_chunk: int, seed: int = 0) -> FakeTransport:
+    """Deliver data to a new AgentProtocol in random-sized reads."""
+    rng = random.Random(seed)
+    transport = FakeTransport()
+    protocol = backend.AgentProtocol()
+    protocol.connection_made(transport)
+    pos = 0
+    while pos < len(data) and not transport.closed:
+        buffer = protocol.get_buffer(-1)
+        n = min(len(buffer), rng.randint(1, max_chunk), len(data) - pos)
+        buffer[:n] = data[pos:pos + n]
+        buffer.release()
+        protocol.buffer_updated(n)
+        pos += n
+    protocol.connection_lost(None)
+    return transport
+
+
+def received_paths() -> list[str]:
+    return [log["parsed_data"]["path"] for log in backend.log_buffer]
+
+
+@pytest.mark.parametrize("max_chunk", [1, 7, 4096, 200_000])
+def test_json_frames(max_chunk):
+    data = b""
+    for frame in range(3):
+        records = [
+            {"timestamp": 1.0, "raw_line": log_line(f"/f{frame}/{i}", i * 97).decode(), "source": SOURCE}
+            for i in range(40)
+        ]
+        payload = orjson.dumps(records)
+        data += FRAME_HEADER.pack(len(payload)) + payload
+
+    transport = feed(data, max_chunk)
+
+    assert not transport.closed
+    assert received_paths() == [f"/f{frame}/{i}" + "x" * (i * 97) for frame in range(3) for i in range(40)]
+
+
+@pytest.mark.parametrize("max_chunk", [1, 7, 4096, 200_000])
+def test_binary_records(max_chunk):
+    data = encode_hello(MODE_BINARY, SOURCE)
+    for i in range(300):
+        line = log_line(f"/r{i}", i * 211 % 5000)
+        data += RECORD_HEADER.pack(SOURCE_ID, 1.0, len(line)) + line
+
+    transport = feed(data, max_chunk)
+
+    assert not transport.closed
+    assert received_paths() == [f"/r{i}" + "x" * (i * 211 % 5000) for i in range(300)]
+    assert {log["source"] for log in backend.log_buffer} == {SOURCE}
+
+
+@pytest.mark.parametrize("max_chunk", [1, 7, 4096, 200_000])
+def test_raw_lines(max_chunk):
+    data = encode_hello(MODE_RAW, SOURCE)
+    data += b"".join(log_line(f"/l{i}", i * 131 % 3000) + b"\n" for i in range(300))
+    # An unterminated last line is dropped with the connection
+    data += log_line("/partial")
+
+    transport = feed(data, max_chunk)
+
+    assert not transport.closed
+    assert received_paths() == [f"/l{i}" + "x" * (i * 131 % 3000) for i in range(300)]
+
+
+@pytest.mark.parametrize("max_chunk", [4096, 200_000])
+def test_oversized_raw_line_is_skipped(max_chunk):
+    data = encode_hello(MODE_RAW, SOURCE)
+    data += log_line("/before") + b"\n"
+    data += b"y" * (3 * MAX_FRAME_SIZE) + b"\n"
+    data += log_line("/after") + b"\n"
+
+    transport = feed(data, max_chunk)
+
+    assert not transport.closed
+    assert received_paths() == ["/before", "/after"]
+
+
+def test_oversized_json_frame_closes_connection():
+    data = FRAME_HEADER.pack(MAX_FRAME_SIZE + 1) + b"[" * 64
+
+    transport = feed(data, 4096)
+
+    assert transport.closed
+    assert received_paths() == []